@@ -9,25 +9,79 @@ This module provides comprehensive analytics and insights with automatic file sa
 """
 
 import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 import pandas as pd
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
-import json
+from typing import Tuple
+
+from restocking_system import SERVICE_LEVELS, RestockingSystem, pending_enum_migrations
+
+try:
+    import pyarrow  # noqa: F401 - optional, enables columnar Parquet exports
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+try:
+    from numba import njit  # optional, JIT-compiles the stock classification kernel
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Simplify paths aggressively to cut Agg vertex counts for the bar charts
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+
+def _classify_stock_numpy(available: np.ndarray, demand_rate: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (days_of_stock, status_rank) using vectorized NumPy passes."""
+    out_of_stock = available == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_stock = np.where(demand_rate > 0, available / demand_rate, 999.0)
+    days_of_stock[out_of_stock] = 0.0
+    status_rank = np.select([out_of_stock, days_of_stock < 7, days_of_stock < 14], [0, 1, 2], default=3)
+    return days_of_stock, status_rank.astype(np.int8)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _classify_stock(available, demand_rate):
+        """Return (days_of_stock, status_rank) in one fused compiled pass."""
+        n = available.size
+        days_of_stock = np.empty(n, np.float64)
+        status_rank = np.empty(n, np.int8)
+        for i in range(n):
+            if available[i] == 0:
+                days = 0.0
+            elif demand_rate[i] > 0:
+                days = available[i] / demand_rate[i]
+            else:
+                days = 999.0
+            days_of_stock[i] = days
+            if available[i] == 0:
+                status_rank[i] = 0
+            elif days < 7:
+                status_rank[i] = 1
+            elif days < 14:
+                status_rank[i] = 2
+            else:
+                status_rank[i] = 3
+        return days_of_stock, status_rank
+else:
+    _classify_stock = _classify_stock_numpy
 
 class SupplyChainAnalytics:
-    def __init__(self, db_path: str = "inventory.db"):
-        """Initialize the supply chain analytics system."""
-        self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-        
-    def calculate_carrier_delivery_performance(self) -> pd.DataFrame:
-        """Calculate average delivery time for shipments per carrier."""
-        query = '''
+    # Analytics queries are compiled once per connection and reused from
+    # sqlite3's statement cache on every later call.
+    # SQLite has no GROUPING SETS, so the per-carrier rollup is UNIONed
+    # onto the per-service rows with a NULL service_level
+    _CARRIER_SQL = '''
+        WITH per_service AS (
             SELECT
                 s.carrier_id,
                 s.service_level,
@@ -48,143 +102,269 @@ class SupplyChainAnalytics:
             FROM shipment s
             WHERE s.actual_delivery IS NOT NULL
             GROUP BY s.carrier_id, s.service_level
-            ORDER BY s.carrier_id, s.service_level
-        '''
+        )
+        SELECT * FROM per_service
+        UNION ALL
+        SELECT
+            carrier_id,
+            NULL as service_level,
+            SUM(total_shipments),
+            AVG(avg_delivery_days),
+            MIN(min_delivery_days),
+            MAX(max_delivery_days),
+            AVG(avg_delay_days),
+            AVG(on_time_percentage)
+        FROM per_service
+        GROUP BY carrier_id
+        ORDER BY carrier_id, service_level
+    '''
+    
+    _PRODUCT_SQL = '''
+        SELECT 
+            p.product_id,
+            p.product_name,
+            p.product_category,
+            p.unit_price,
+            SUM(o.quantity) as total_units_sold,
+            COUNT(DISTINCT o.order_id) as total_orders,
+            SUM(o.quantity * p.unit_price) as total_revenue,
+            AVG(o.quantity) as avg_order_quantity,
+            COUNT(DISTINCT o.customer_id) as unique_customers
+        FROM product p
+        JOIN orders o ON p.product_id = o.product_id
+        WHERE o.order_date >= ? 
+            AND o.order_status IN (1, 2)  -- Shipped, Delivered
+        GROUP BY p.product_id, p.product_name, p.product_category, p.unit_price
+        ORDER BY total_units_sold DESC
+        LIMIT 5
+    '''
+    
+    # Days of stock and stock status are classified in NumPy after the fetch;
+    # the query only supplies the inputs (raw_demand_rate is kept for ordering)
+    _SHORTAGE_SQL = '''
+        WITH demand_analysis AS (
+            SELECT 
+                o.product_id,
+                s.warehouse_id,
+                COUNT(*) as order_frequency,
+                SUM(o.quantity) as total_demand_30days,
+                AVG(o.quantity) as avg_demand_per_order,
+                SUM(o.quantity) / 30.0 as daily_demand_rate
+            FROM orders o
+            JOIN shipment s ON o.order_id = s.order_id
+            WHERE o.order_date >= date('now', '-30 days')
+                AND o.order_status IN (1, 2)  -- Shipped, Delivered
+            GROUP BY o.product_id, s.warehouse_id
+        ),
+        current_inventory AS (
+            SELECT 
+                i.product_id,
+                i.warehouse_id,
+                i.stock_quantity,
+                i.reserved_quantity,
+                (i.stock_quantity - i.reserved_quantity) as available_stock
+            FROM inventory i
+        )
+        SELECT 
+            w.warehouse_id,
+            w.warehouse_name,
+            w.location,
+            ci.product_id,
+            p.product_name,
+            p.product_category,
+            ci.available_stock,
+            COALESCE(da.daily_demand_rate, 0.1) as daily_demand_rate,
+            COALESCE(da.total_demand_30days, 0) as demand_last_30days,
+            da.daily_demand_rate as raw_demand_rate
+        FROM current_inventory ci
+        JOIN warehouse w ON w.warehouse_id = ci.warehouse_id
+        LEFT JOIN demand_analysis da ON ci.product_id = da.product_id 
+            AND ci.warehouse_id = da.warehouse_id
+        LEFT JOIN product p ON ci.product_id = p.product_id
+        ORDER BY w.warehouse_id, da.daily_demand_rate DESC
+    '''
+    
+    # Service level names indexed by their stored integer code
+    _SERVICE_LEVELS = np.array(SERVICE_LEVELS, dtype=object)
+    
+    # Stock statuses indexed by urgency rank
+    _STOCK_STATUSES = np.array(['OUT_OF_STOCK', 'CRITICAL', 'LOW', 'ADEQUATE'], dtype=object)
+    
+    def __init__(self, db_path: str = "inventory.db"):
+        """Initialize the supply chain analytics system."""
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, cached_statements=256)
+        
+        # Tune the connection for the read-heavy analytics queries
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA cache_size=-131072")  # 128 MB page cache
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        
+        # The queries filter and decode integer enum codes; databases still on the
+        # TEXT schema are upgraded through the restocking system's migration first
+        if pending_enum_migrations(self.conn):
+            print("Upgrading database schema to integer status codes...")
+            RestockingSystem(db_path).close()
+        
+        # Refresh planner statistics so joins in the shortage CTE use the indexes
+        self.conn.execute("ANALYZE")
+        
+        # Memoized query results keyed by (method name, args)
+        self._cache = {}
+        # Holds the read-only connection of a query worker thread
+        self._local = threading.local()
+        
+    def _open_worker_connection(self) -> sqlite3.Connection:
+        """Open a read-only connection for a query worker thread."""
+        conn = sqlite3.connect(Path(self.db_path).resolve().as_uri() + '?mode=ro', uri=True,
+                               cached_statements=256)
+        conn.execute("PRAGMA cache_size=-131072")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+    
+    def _run_on_worker_connection(self, query_method):
+        """Run an analytics method in a worker thread against its own connection."""
+        self._local.conn = self._open_worker_connection()
+        try:
+            return query_method()
+        finally:
+            self._local.conn.close()
+            del self._local.conn
+    
+    def _run_all_queries(self):
+        """Run the three analytics queries concurrently, filling the result cache."""
+        # Only queries whose results are not memoized yet need a worker connection
+        query_methods = [method for method, key in (
+                             (self._carrier_rollups, ('_carrier_rollups', ())),
+                             (self.identify_top_selling_products, ('identify_top_selling_products', (90,))),
+                             (self.analyze_inventory_shortages, ('analyze_inventory_shortages', ())))
+                         if key not in self._cache]
+        if not query_methods:
+            return
+        
+        with ThreadPoolExecutor(max_workers=len(query_methods)) as executor:
+            futures = [executor.submit(self._run_on_worker_connection, method) for method in query_methods]
+            for future in as_completed(futures):
+                future.result()  # Re-raise any query error
+    
+    def _read_query(self, query: str, params: Tuple = ()) -> pd.DataFrame:
+        """Run a query and build the DataFrame column by column from the cursor."""
+        conn = getattr(self._local, 'conn', self.conn)
+        cursor = conn.execute(query, params)
+        names = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+        
+        # Transpose rows into columns once instead of letting pandas infer row-wise
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        # copy=False keeps each column in its own contiguous 1D buffer rather than
+        # consolidating same-dtype columns into a shared 2D block
+        return pd.DataFrame({name: np.ascontiguousarray(column) for name, column in zip(names, columns)},
+                            copy=False)
+    
+    def _column_copy(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Copy a memoized frame column by column so each column keeps its own 1D buffer."""
+        # DataFrame.copy() would consolidate same-dtype columns into shared 2D blocks
+        return pd.DataFrame({name: df[name].copy() for name in df.columns}, copy=False)
+    
+    def calculate_carrier_delivery_performance(self) -> pd.DataFrame:
+        """Calculate average delivery time for shipments per carrier."""
+        per_service, _ = self._carrier_rollups()
+        return per_service
+    
+    def _carrier_rollups(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Fetch carrier stats per (carrier, service level) and per carrier in one query."""
+        key = ('_carrier_rollups', ())
+        if key in self._cache:
+            per_service, per_carrier = self._cache[key]
+            return self._column_copy(per_service), self._column_copy(per_carrier)
         
-        df = pd.read_sql_query(query, self.conn)
+        df = self._read_query(self._CARRIER_SQL)
         
         # Round numerical values for better display
         numerical_cols = ['avg_delivery_days', 'min_delivery_days', 'max_delivery_days', 
                          'avg_delay_days', 'on_time_percentage']
-        for col in numerical_cols:
-            if col in df.columns:
-                df[col] = df[col].round(2)
+        numerical_cols = [col for col in numerical_cols if col in df.columns]
+        df[numerical_cols] = df[numerical_cols].round(2)
+        
+        is_rollup = df['service_level'].isna()
+        per_service = df[~is_rollup].reset_index(drop=True)
+        per_service['service_level'] = self._SERVICE_LEVELS[per_service['service_level'].to_numpy(dtype=np.int64)]
+        per_carrier = df[is_rollup].drop(columns='service_level').reset_index(drop=True)
         
-        return df
+        self._cache[key] = (per_service, per_carrier)
+        return self._column_copy(per_service), self._column_copy(per_carrier)
     
     def identify_top_selling_products(self, days: int = 90) -> pd.DataFrame:
         """Identify top 5 best-selling products in the last quarter (90 days)."""
+        key = ('identify_top_selling_products', (days,))
+        if key in self._cache:
+            return self._column_copy(self._cache[key])
+        
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        query = '''
-            SELECT 
-                p.product_id,
-                p.product_name,
-                p.product_category,
-                p.unit_price,
-                SUM(o.quantity) as total_units_sold,
-                COUNT(DISTINCT o.order_id) as total_orders,
-                SUM(o.quantity * p.unit_price) as total_revenue,
-                AVG(o.quantity) as avg_order_quantity,
-                COUNT(DISTINCT o.customer_id) as unique_customers
-            FROM product p
-            JOIN orders o ON p.product_id = o.product_id
-            WHERE o.order_date >= ? 
-                AND o.order_status IN ('Shipped', 'Delivered')
-            GROUP BY p.product_id, p.product_name, p.product_category, p.unit_price
-            ORDER BY total_units_sold DESC
-            LIMIT 5
-        '''
-        
-        df = pd.read_sql_query(query, self.conn, params=(cutoff_date.date(),))
+        df = self._read_query(self._PRODUCT_SQL, (cutoff_date.date(),))
         
         # Round numerical values
-        df['total_revenue'] = df['total_revenue'].round(2)
-        df['avg_order_quantity'] = df['avg_order_quantity'].round(2)
-        df['unit_price'] = df['unit_price'].round(2)
+        numerical_cols = ['total_revenue', 'avg_order_quantity', 'unit_price']
+        df[numerical_cols] = df[numerical_cols].round(2)
         
-        return df
+        self._cache[key] = df
+        return self._column_copy(df)
     
     def analyze_inventory_shortages(self) -> pd.DataFrame:
         """Analyze inventory shortages per warehouse based on demand trends."""
-        query = '''
-            WITH demand_analysis AS (
-                SELECT 
-                    o.product_id,
-                    s.warehouse_id,
-                    COUNT(*) as order_frequency,
-                    SUM(o.quantity) as total_demand_30days,
-                    AVG(o.quantity) as avg_demand_per_order,
-                    SUM(o.quantity) / 30.0 as daily_demand_rate
-                FROM orders o
-                JOIN shipment s ON o.order_id = s.order_id
-                WHERE o.order_date >= date('now', '-30 days')
-                    AND o.order_status IN ('Shipped', 'Delivered')
-                GROUP BY o.product_id, s.warehouse_id
-            ),
-            current_inventory AS (
-                SELECT 
-                    i.product_id,
-                    i.warehouse_id,
-                    i.stock_quantity,
-                    i.reserved_quantity,
-                    (i.stock_quantity - i.reserved_quantity) as available_stock
-                FROM inventory i
-            )
-            SELECT 
-                w.warehouse_id,
-                w.warehouse_name,
-                w.location,
-                ci.product_id,
-                p.product_name,
-                p.product_category,
-                ci.available_stock,
-                COALESCE(da.daily_demand_rate, 0.1) as daily_demand_rate,
-                COALESCE(da.total_demand_30days, 0) as demand_last_30days,
-                CASE
-                    WHEN ci.available_stock = 0 THEN 0
-                    WHEN COALESCE(da.daily_demand_rate, 0.1) > 0
-                    THEN ci.available_stock / COALESCE(da.daily_demand_rate, 0.1)
-                    ELSE 999
-                END as days_of_stock,
-                CASE 
-                    WHEN ci.available_stock = 0 THEN 'OUT_OF_STOCK'
-                    WHEN ci.available_stock / COALESCE(da.daily_demand_rate, 0.1) < 7 THEN 'CRITICAL'
-                    WHEN ci.available_stock / COALESCE(da.daily_demand_rate, 0.1) < 14 THEN 'LOW'
-                    ELSE 'ADEQUATE'
-                END as stock_status
-            FROM warehouse w
-            CROSS JOIN current_inventory ci
-            LEFT JOIN demand_analysis da ON ci.product_id = da.product_id 
-                AND ci.warehouse_id = da.warehouse_id
-            LEFT JOIN product p ON ci.product_id = p.product_id
-            WHERE ci.warehouse_id = w.warehouse_id
-            ORDER BY w.warehouse_id, 
-                CASE stock_status 
-                    WHEN 'OUT_OF_STOCK' THEN 1 
-                    WHEN 'CRITICAL' THEN 2 
-                    WHEN 'LOW' THEN 3 
-                    ELSE 4 
-                END,
-                da.daily_demand_rate DESC
-        '''
-        
-        df = pd.read_sql_query(query, self.conn)
+        key = ('analyze_inventory_shortages', ())
+        if key in self._cache:
+            return self._column_copy(self._cache[key])
+        
+        df = self._read_query(self._SHORTAGE_SQL)
+        
+        # Classify stock levels over the fetched columns (numba kernel when available)
+        days_of_stock, status_rank = _classify_stock(df['available_stock'].to_numpy(dtype=np.float64),
+                                                     df['daily_demand_rate'].to_numpy(dtype=np.float64))
+        
+        df['days_of_stock'] = days_of_stock
+        df['stock_status'] = self._STOCK_STATUSES[status_rank]
+        
+        # Most urgent status first within each warehouse; the stable sort keeps the
+        # query's demand-rate ordering within a status
+        order = np.lexsort((status_rank, df['warehouse_id'].to_numpy()))
+        df = df.take(order).drop(columns='raw_demand_rate').reset_index(drop=True)
         
         # Round numerical values
-        df['daily_demand_rate'] = df['daily_demand_rate'].round(3)
-        df['days_of_stock'] = df['days_of_stock'].round(1)
+        df = df.round({'daily_demand_rate': 3, 'days_of_stock': 1})
         
-        return df
+        self._cache[key] = df
+        return self._column_copy(df)
+    
+    def _count_stock_status(self, shortage_df: pd.DataFrame) -> pd.DataFrame:
+        """Count products per warehouse and stock status as a warehouse x status table."""
+        warehouses, warehouse_idx = np.unique(shortage_df['warehouse_name'].to_numpy(), return_inverse=True)
+        statuses, status_idx = np.unique(shortage_df['stock_status'].to_numpy(), return_inverse=True)
+        
+        counts = np.zeros((len(warehouses), len(statuses)), dtype=np.int64)
+        np.add.at(counts, (warehouse_idx, status_idx), 1)
+        
+        return pd.DataFrame(counts,
+                            index=pd.Index(warehouses, name='warehouse_name'),
+                            columns=pd.Index(statuses, name='stock_status'))
     
     def create_all_visualizations(self):
         """Create all visualizations and save them to files."""
+        self._run_all_queries()
+        
         print("📊 Creating carrier performance visualization...")
-        carrier_df = self.calculate_carrier_delivery_performance()
+        carrier_df, carrier_stats = self._carrier_rollups()
         
-        fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(20, 6))
+        fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(20, 6), constrained_layout=True)
         fig.suptitle('Carrier Performance Analysis', fontsize=16, fontweight='bold')
         
         # Define colors for service levels
         service_level_colors = {'Express': '#ff7f0e', 'Standard': '#2ca02c', 'Overnight': '#d62728'}
         
         # 1. Delivery Days Range (Min-Max) by Carrier
-        carrier_stats = carrier_df.groupby('carrier_id').agg({
-            'avg_delivery_days': 'mean',
-            'min_delivery_days': 'min',
-            'max_delivery_days': 'max'
-        }).reset_index()
-        
         x_pos = np.arange(len(carrier_stats))
         bars1 = ax1.bar(x_pos, carrier_stats['avg_delivery_days'],
                        color=['#1f77b4', '#ff7f0e', '#2ca02c'], alpha=0.7, label='Average')
@@ -197,13 +377,10 @@ class SupplyChainAnalytics:
         ax1.grid(axis='y', alpha=0.3)
         
         # Add value labels
-        for i, (bar, avg_days) in enumerate(zip(bars1, carrier_stats['avg_delivery_days'])):
-            ax1.text(bar.get_x() + bar.get_width()/2., avg_days + 0.2,
-                    f'{avg_days:.1f}', ha='center', va='bottom', fontweight='bold')
+        ax1.bar_label(bars1, fmt='%.1f', fontweight='bold', padding=3)
         
         # 2. Service Level Count by Carrier - Grouped Bar Chart
-        service_counts = carrier_df.groupby(['carrier_id', 'service_level'])['total_shipments'].sum().reset_index()
-        service_pivot = service_counts.pivot(index='carrier_id', columns='service_level', values='total_shipments').fillna(0)
+        service_pivot = carrier_df.pivot(index='carrier_id', columns='service_level', values='total_shipments').fillna(0)
         
         # Ensure all service levels are represented
         for service in ['Express', 'Standard', 'Overnight']:
@@ -222,10 +399,8 @@ class SupplyChainAnalytics:
                           label=service, color=service_level_colors[service])
             
             # Add value labels on bars
-            for bar, count in zip(bars, counts):
-                if count > 0:
-                    ax2.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.2,
-                            f'{int(count)}', ha='center', va='bottom', fontweight='bold')
+            ax2.bar_label(bars, labels=[f'{int(count)}' if count > 0 else '' for count in counts],
+                          fontweight='bold', padding=3)
         
         ax2.set_title('Service Level Shipment Count by Carrier')
         ax2.set_ylabel('Number of Shipments')
@@ -236,8 +411,7 @@ class SupplyChainAnalytics:
         ax2.grid(axis='y', alpha=0.3)
         
         # 3. On-Time Delivery Percentage by Carrier
-        carrier_ontime = carrier_df.groupby('carrier_id')['on_time_percentage'].mean().reset_index()
-        bars3 = ax3.bar(carrier_ontime['carrier_id'], carrier_ontime['on_time_percentage'],
+        bars3 = ax3.bar(carrier_stats['carrier_id'], carrier_stats['on_time_percentage'],
                        color=['#1f77b4', '#ff7f0e', '#2ca02c'], alpha=0.8)
         
         ax3.set_title('On-Time Delivery Percentage by Carrier')
@@ -247,9 +421,7 @@ class SupplyChainAnalytics:
         ax3.grid(axis='y', alpha=0.3)
         
         # Add value labels and percentage formatting
-        for bar, percentage in zip(bars3, carrier_ontime['on_time_percentage']):
-            ax3.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 1,
-                    f'{percentage:.1f}%', ha='center', va='bottom', fontweight='bold')
+        ax3.bar_label(bars3, fmt='%.1f%%', fontweight='bold', padding=3)
         
         # Add horizontal reference lines for performance benchmarks
         ax3.axhline(y=95, color='green', linestyle='--', alpha=0.7, label='Excellent (95%+)')
@@ -257,14 +429,14 @@ class SupplyChainAnalytics:
         ax3.axhline(y=60, color='red', linestyle='--', alpha=0.7, label='Poor (<60%)')
         ax3.legend(loc='upper right', fontsize=8)
         
-        plt.tight_layout()
-        plt.savefig('carrier_performance_analysis.png', dpi=300, bbox_inches='tight')
+        plt.savefig('carrier_performance_analysis.png', dpi=150, bbox_inches='tight',
+                    pil_kwargs={'compress_level': 1})
         plt.close()
         
         print("📊 Creating top products visualization...")
         products_df = self.identify_top_selling_products()
         
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6), constrained_layout=True)
         fig.suptitle('Top 5 Best-Selling Products (Last 90 Days)', fontsize=16, fontweight='bold')
         
         # Define color palette for product categories
@@ -282,50 +454,41 @@ class SupplyChainAnalytics:
         }
         
         # Get colors for each product based on category
-        product_colors = [category_colors.get(category, '#1f77b4') for category in products_df['product_category']]
+        product_categories = products_df['product_category'].values
+        product_colors = [category_colors.get(category, '#1f77b4') for category in product_categories]
+        # Category -> color in first-seen order, shared by both charts and the legend
+        legend_colors = dict(zip(product_categories, product_colors))
         
         # 1. Units Sold
         bars1 = ax1.barh(products_df['product_name'], products_df['total_units_sold'],
                         color=product_colors, alpha=0.8)
         ax1.set_title('Total Units Sold')
         ax1.set_xlabel('Units')
-        for i, bar in enumerate(bars1):
-            width = bar.get_width()
-            ax1.text(width + 0.5, bar.get_y() + bar.get_height()/2.,
-                    f'{int(width)}', ha='left', va='center')
+        ax1.bar_label(bars1, fmt='%d', padding=3)
         
         # 2. Revenue Generated
         bars2 = ax2.barh(products_df['product_name'], products_df['total_revenue'],
                         color=product_colors, alpha=0.8)
         ax2.set_title('Total Revenue Generated')
         ax2.set_xlabel('Revenue ($)')
-        for i, bar in enumerate(bars2):
-            width = bar.get_width()
-            ax2.text(width + 10, bar.get_y() + bar.get_height()/2.,
-                    f'${width:.0f}', ha='left', va='center')
-        
-        # Add category legend
-        unique_categories = products_df['product_category'].unique()
-        legend_handles = [plt.Rectangle((0,0),1,1, color=category_colors.get(cat, '#1f77b4'), alpha=0.8)
-                         for cat in unique_categories]
-        fig.legend(legend_handles, unique_categories, loc='upper center', bbox_to_anchor=(0.5, 0.02),
-                  ncol=len(unique_categories), fontsize=10, title='Product Categories')
-        
-        # Adjust layout to make room for legend
-        plt.subplots_adjust(bottom=0.15)
-        
-        plt.tight_layout()
-        plt.savefig('top_products_analysis.png', dpi=300, bbox_inches='tight')
+        ax2.bar_label(bars2, fmt='$%.0f', padding=3)
+        
+        # Add category legend; an 'outside' location lets constrained layout reserve room for it
+        legend_handles = [plt.Rectangle((0,0),1,1, color=color, alpha=0.8) for color in legend_colors.values()]
+        fig.legend(legend_handles, list(legend_colors), loc='outside lower center',
+                  ncol=len(legend_colors), fontsize=10, title='Product Categories')
+        
+        plt.savefig('top_products_analysis.png', dpi=150, bbox_inches='tight',
+                    pil_kwargs={'compress_level': 1})
         plt.close()
         
         print("📊 Creating inventory shortage visualization...")
         shortage_df = self.analyze_inventory_shortages()
         
         # Create summary by warehouse and status
-        shortage_summary = shortage_df.groupby(['warehouse_name', 'stock_status']).size().reset_index(name='count')
-        shortage_pivot = shortage_summary.pivot(index='warehouse_name', columns='stock_status', values='count').fillna(0)
+        shortage_pivot = self._count_stock_status(shortage_df)
         
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6), constrained_layout=True)
         fig.suptitle('Inventory Shortage Analysis by Warehouse', fontsize=16, fontweight='bold')
         
         # 1. Stacked bar chart of stock status by warehouse
@@ -377,9 +540,10 @@ class SupplyChainAnalytics:
                                 color=status_color, fontsize=10, transform=ax2.transAxes)
                         y_pos -= 0.06
                         
-                        for _, item in status_items.iterrows():
-                            stock_info = f"({int(item['available_stock'])} units)"
-                            ax2.text(0.10, y_pos, f"• {item['product_name']} {stock_info}",
+                        for product_name, available_stock in zip(status_items['product_name'].values,
+                                                                 status_items['available_stock'].values):
+                            stock_info = f"({int(available_stock)} units)"
+                            ax2.text(0.10, y_pos, f"• {product_name} {stock_info}",
                                     fontsize=9, transform=ax2.transAxes, color='#34495e')
                             y_pos -= 0.045
                         y_pos -= 0.02
@@ -398,18 +562,24 @@ class SupplyChainAnalytics:
             ax2.text(0.5, 0.5, 'No products in shortage status',
                     ha='center', va='center', fontsize=12, transform=ax2.transAxes)
         
-        plt.tight_layout()
-        plt.savefig('inventory_shortage_analysis.png', dpi=300, bbox_inches='tight')
+        plt.savefig('inventory_shortage_analysis.png', dpi=150, bbox_inches='tight',
+                    pil_kwargs={'compress_level': 1})
         plt.close()
         
         return carrier_df, products_df, shortage_df
     
     def generate_supply_chain_insights_report(self) -> str:
         """Generate comprehensive supply chain optimization insights report."""
+        return "\n".join(self._iter_report_lines())
+    
+    def _iter_report_lines(self):
+        """Yield the insights report line by line so callers can stream it."""
         print("🔍 Generating Supply Chain Analytics Report...")
         
         # Get all analytics data and create visualizations
         carrier_df, products_df, shortage_df = self.create_all_visualizations()
+        _, carrier_stats = self._carrier_rollups()
+        carrier_avg_performance = carrier_stats.set_index('carrier_id')['on_time_percentage']
         
         # Calculate key metrics
         total_revenue = products_df['total_revenue'].sum()
@@ -417,128 +587,123 @@ class SupplyChainAnalytics:
         critical_shortages = len(shortage_df[shortage_df['stock_status'].isin(['OUT_OF_STOCK', 'CRITICAL'])])
         
         # Find best overall carrier (average performance across all service levels)
-        carrier_avg_performance = carrier_df.groupby('carrier_id')['on_time_percentage'].mean()
         best_carrier = carrier_avg_performance.idxmax()
         
-        report = []
-        report.append("=" * 80)
-        report.append("SUPPLY CHAIN OPTIMIZATION INSIGHTS REPORT")
-        report.append("=" * 80)
-        report.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append("")
-        
-        # Executive Summary
-        report.append("📋 EXECUTIVE SUMMARY")
-        report.append("-" * 30)
-        report.append(f"• Total revenue from top 5 products: ${total_revenue:,.2f}")
-        report.append(f"• Average delivery time per carrier: {avg_delivery_time:.1f} days")
-        report.append(f"• Critical inventory shortages identified: {critical_shortages} items")
-        report.append(f"• Best performing carrier: {best_carrier}")
-        report.append("")
-        
-        # Carrier Performance Analysis - Organized by Carrier
-        report.append("🚚 CARRIER PERFORMANCE ANALYSIS")
-        report.append("-" * 40)
-        
-        for carrier in sorted(carrier_df['carrier_id'].unique()):
+        yield from [
+            "=" * 80,
+            "SUPPLY CHAIN OPTIMIZATION INSIGHTS REPORT",
+            "=" * 80,
+            f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "",
+            # Executive Summary
+            "📋 EXECUTIVE SUMMARY",
+            "-" * 30,
+            f"• Total revenue from top 5 products: ${total_revenue:,.2f}",
+            f"• Average delivery time per carrier: {avg_delivery_time:.1f} days",
+            f"• Critical inventory shortages identified: {critical_shortages} items",
+            f"• Best performing carrier: {best_carrier}",
+            "",
+            # Carrier Performance Analysis - Organized by Carrier
+            "🚚 CARRIER PERFORMANCE ANALYSIS",
+            "-" * 40,
+        ]
+        
+        for carrier, carrier_avg, carrier_ontime, carrier_total in zip(carrier_stats['carrier_id'].values,
+                                                                        carrier_stats['avg_delivery_days'].values,
+                                                                        carrier_stats['on_time_percentage'].values,
+                                                                        carrier_stats['total_shipments'].values):
             carrier_data = carrier_df[carrier_df['carrier_id'] == carrier]
-            report.append(f"• {carrier}:")
+            yield f"• {carrier}:"
             
             # Show performance for each service level this carrier handles
-            for _, row in carrier_data.iterrows():
-                report.append(f"  - {row['service_level']}: {row['avg_delivery_days']:.1f} days avg, {row['on_time_percentage']:.1f}% on-time, {row['total_shipments']} shipments")
+            yield from (
+                f"  - {service_level}: {avg_days:.1f} days avg, {on_time:.1f}% on-time, {shipments} shipments"
+                for service_level, avg_days, on_time, shipments in zip(carrier_data['service_level'].values,
+                                                                       carrier_data['avg_delivery_days'].values,
+                                                                       carrier_data['on_time_percentage'].values,
+                                                                       carrier_data['total_shipments'].values)
+            )
             
-            # Calculate overall average for this carrier
-            avg_delivery = carrier_data['avg_delivery_days'].mean()
-            avg_ontime = carrier_data['on_time_percentage'].mean()
-            total_shipments = carrier_data['total_shipments'].sum()
-            report.append(f"  → Overall Average: {avg_delivery:.1f} days, {avg_ontime:.1f}% on-time, {total_shipments} total shipments")
-            report.append("")
+            # Overall average for this carrier comes from the SQL rollup
+            yield from [
+                f"  → Overall Average: {carrier_avg:.1f} days, {carrier_ontime:.1f}% on-time, {carrier_total} total shipments",
+                "",
+            ]
         
         # Top Products Analysis
-        report.append("🏆 TOP 5 BEST-SELLING PRODUCTS (Last 90 Days)")
-        report.append("-" * 50)
-        for i, (_, row) in enumerate(products_df.iterrows(), 1):
-            report.append(f"{i}. {row['product_name']} ({row['product_category']})")
-            report.append(f"   - Units sold: {row['total_units_sold']:,}")
-            report.append(f"   - Revenue: ${row['total_revenue']:,.2f}")
-            report.append(f"   - Unique customers: {row['unique_customers']}")
-        report.append("")
+        yield from ["🏆 TOP 5 BEST-SELLING PRODUCTS (Last 90 Days)", "-" * 50]
+        for i, row in enumerate(products_df.itertuples(index=False), 1):
+            yield from [
+                f"{i}. {row.product_name} ({row.product_category})",
+                f"   - Units sold: {row.total_units_sold:,}",
+                f"   - Revenue: ${row.total_revenue:,.2f}",
+                f"   - Unique customers: {row.unique_customers}",
+            ]
+        yield ""
         
         # Inventory Shortage Analysis
-        report.append("⚠️  INVENTORY SHORTAGE ANALYSIS")
-        report.append("-" * 35)
+        yield from ["⚠️  INVENTORY SHORTAGE ANALYSIS", "-" * 35]
         
         # Group by warehouse
-        shortage_by_warehouse = shortage_df.groupby(['warehouse_name', 'stock_status']).size().unstack(fill_value=0)
-        
-        for warehouse in shortage_by_warehouse.index:
-            report.append(f"• {warehouse}:")
-            if 'OUT_OF_STOCK' in shortage_by_warehouse.columns:
-                out_of_stock = shortage_by_warehouse.loc[warehouse, 'OUT_OF_STOCK']
-                if out_of_stock > 0:
-                    report.append(f"  - Out of stock: {out_of_stock} products")
-            if 'CRITICAL' in shortage_by_warehouse.columns:
-                critical = shortage_by_warehouse.loc[warehouse, 'CRITICAL']
-                if critical > 0:
-                    report.append(f"  - Critical (< 7 days): {critical} products")
-            if 'LOW' in shortage_by_warehouse.columns:
-                low = shortage_by_warehouse.loc[warehouse, 'LOW']
-                if low > 0:
-                    report.append(f"  - Low stock (< 14 days): {low} products")
-        report.append("")
-        
-        # Key Recommendations
-        report.append("💡 KEY RECOMMENDATIONS")
-        report.append("-" * 25)
+        shortage_by_warehouse = self._count_stock_status(shortage_df)
+        shortage_labels = [('OUT_OF_STOCK', 'Out of stock'),
+                           ('CRITICAL', 'Critical (< 7 days)'),
+                           ('LOW', 'Low stock (< 14 days)')]
+        status_counts = [(label, shortage_by_warehouse[status].to_numpy())
+                         for status, label in shortage_labels if status in shortage_by_warehouse.columns]
+        
+        for i, warehouse in enumerate(shortage_by_warehouse.index):
+            yield f"• {warehouse}:"
+            yield from (f"  - {label}: {counts[i]} products" for label, counts in status_counts if counts[i] > 0)
+        yield ""
         
         # Carrier recommendations - use overall carrier averages for consistency
-        carrier_avg_performance = carrier_df.groupby('carrier_id')['on_time_percentage'].mean()
         worst_carrier_id = carrier_avg_performance.idxmin()
         worst_carrier_performance = carrier_avg_performance.min()
         best_carrier_performance = carrier_avg_performance.max()
         
-        report.append("🚚 Carrier Optimization:")
-        report.append(f"• Consider renegotiating with {worst_carrier_id} (lowest on-time: {worst_carrier_performance:.1f}%)")
-        report.append(f"• Leverage {best_carrier} for critical deliveries (best on-time: {best_carrier_performance:.1f}%)")
-        
-        # Product recommendations
-        report.append(f"\n🏆 Product Focus:")
-        report.append(f"• Consider expanding {products_df['product_category'].mode()[0]} category")
+        yield from [
+            # Key Recommendations
+            "💡 KEY RECOMMENDATIONS",
+            "-" * 25,
+            "🚚 Carrier Optimization:",
+            f"• Consider renegotiating with {worst_carrier_id} (lowest on-time: {worst_carrier_performance:.1f}%)",
+            f"• Leverage {best_carrier} for critical deliveries (best on-time: {best_carrier_performance:.1f}%)",
+            # Product recommendations
+            f"\n🏆 Product Focus:",
+            f"• Consider expanding {products_df['product_category'].mode()[0]} category",
+        ]
         
         # Inventory recommendations
         critical_warehouses = shortage_df[shortage_df['stock_status'] == 'OUT_OF_STOCK']['warehouse_name'].unique()
         if len(critical_warehouses) > 0:
-            report.append(f"\n⚠️  Urgent Inventory Actions:")
-            for warehouse in critical_warehouses[:3]:  # Top 3 most critical
-                report.append(f"• Immediate restocking required for {warehouse}")
-        
-        report.append(f"\n📊 VISUALIZATION FILES CREATED:")
-        report.append("-" * 35)
-        report.append("• carrier_performance_analysis.png")
-        report.append("• top_products_analysis.png") 
-        report.append("• inventory_shortage_analysis.png")
-        
-        return "\n".join(report)
+            yield f"\n⚠️  Urgent Inventory Actions:"
+            yield from (f"• Immediate restocking required for {warehouse}"
+                        for warehouse in critical_warehouses[:3])  # Top 3 most critical
+        
+        yield from [
+            f"\n📊 VISUALIZATION FILES CREATED:",
+            "-" * 35,
+            "• carrier_performance_analysis.png",
+            "• top_products_analysis.png",
+            "• inventory_shortage_analysis.png",
+        ]
     
     def export_analytics_data(self):
-        """Export all analytics data to files."""
-        # Export carrier performance
-        carrier_df = self.calculate_carrier_delivery_performance()
-        carrier_df.to_csv('carrier_performance_data.csv', index=False)
-        
-        # Export top products
-        products_df = self.identify_top_selling_products()
-        products_df.to_csv('top_products_data.csv', index=False)
-        
-        # Export inventory analysis
-        inventory_df = self.analyze_inventory_shortages()
-        inventory_df.to_csv('inventory_shortage_data.csv', index=False)
+        """Export all analytics data to files (plus Parquet copies when pyarrow is installed)."""
+        exports = [
+            ('carrier_performance_data', self.calculate_carrier_delivery_performance()),
+            ('top_products_data', self.identify_top_selling_products()),
+            ('inventory_shortage_data', self.analyze_inventory_shortages()),
+        ]
         
         print("📁 Analytics data exported:")
-        print("  - carrier_performance_data.csv")
-        print("  - top_products_data.csv")
-        print("  - inventory_shortage_data.csv")
+        for name, df in exports:
+            df.to_csv(f'{name}.csv', index=False)
+            print(f"  - {name}.csv")
+            if PARQUET_AVAILABLE:
+                df.to_parquet(f'{name}.parquet', compression='zstd', index=False)
+                print(f"  - {name}.parquet")
     
     def close(self):
         """Close database connection."""
@@ -553,16 +718,17 @@ def main():
     analytics = SupplyChainAnalytics()
     
     try:
-        # Generate comprehensive report
-        report = analytics.generate_supply_chain_insights_report()
-        print(report)
+        # Generate the report, streaming each line to the console and to a
+        # UTF-8 file (to handle emojis) instead of holding it all in memory
+        with open('supply_chain_insights_report.txt', 'w', encoding='utf-8', buffering=8192) as f:
+            for line in analytics._iter_report_lines():
+                line += "\n"
+                sys.stdout.write(line)
+                f.write(line)
         
         # Export data
         analytics.export_analytics_data()
         
-        # Save report to file with UTF-8 encoding to handle emojis
-        with open('supply_chain_insights_report.txt', 'w', encoding='utf-8') as f:
-            f.write(report)
         print("\n📄 Full report saved to: supply_chain_insights_report.txt")
         
     finally:
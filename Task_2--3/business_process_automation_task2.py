@@ -2,8 +2,7 @@
 Demonstration script showing all capabilities of the Restocking System
 """
 
-from restocking_system import RestockingSystem
-import json
+from restocking_system import RestockingSystem, write_json
 
 def main():
     print("🏪 INVENTORY RESTOCKING SYSTEM DEMONSTRATION")
@@ -52,10 +51,9 @@ def main():
             print(f"Recommended Restock: {top_rec['recommended_restock_quantity']} units")
         
         print(f"\n💾 Exporting results...")
-        system.export_recommendations_csv()
+        system.export_recommendations_csv(recommendations=recommendations)
         
-        with open('detailed_recommendations.json', 'w') as f:
-            json.dump(recommendations, f, indent=2)
+        write_json(recommendations, 'detailed_recommendations.json')
         
         print("✅ Files created:")
         print("  - restock_recommendations.csv")
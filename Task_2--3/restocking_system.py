@@ -11,272 +11,546 @@ Based on the ontology diagram, this system considers:
 """
 
 import sqlite3
-import pandas as pd
+import csv
 import numpy as np
 from datetime import datetime, timedelta
-import random
 import string
 from typing import List, Tuple, Dict
 import json
 
+try:
+    import orjson  # optional, C-accelerated JSON serialization
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit  # optional, JIT-compiles the recommendation kernel
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Enum columns are stored as small integer codes indexing these name tuples.
+# Service levels are listed alphabetically so ordering by code matches ordering by name
+ORDER_STATUSES = ('Pending', 'Shipped', 'Delivered', 'Canceled')
+SERVICE_LEVELS = ('Express', 'Overnight', 'Standard')
+SHIPMENT_STATUSES = ('In Transit', 'Delivered', 'Delayed')
+ORDER_STATUS = {name: code for code, name in enumerate(ORDER_STATUSES)}
+SERVICE_LEVEL = {name: code for code, name in enumerate(SERVICE_LEVELS)}
+SHIPMENT_STATUS = {name: code for code, name in enumerate(SHIPMENT_STATUSES)}
+
+# Dummy-data key tables, formatted once instead of per generated row
+CUSTOMER_IDS = tuple(f"C{i:03d}" for i in range(1, 51))
+PRODUCT_IDS = tuple(f"P{i:03d}" for i in range(1, 31))
+WAREHOUSE_IDS = tuple(f"W{i:02d}" for i in range(1, 11))
+
+def _enum_case(column: str, names: Tuple[str, ...]) -> str:
+    """Return a SQL CASE expression mapping an enum name column to its integer code."""
+    whens = " ".join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(names))
+    return f"CASE {column} {whens} END"
+
+def pending_enum_migrations(conn: sqlite3.Connection) -> List[str]:
+    """Return enum tables still stored as TEXT or left behind as <name>_text."""
+    tables = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+    return [
+        name for name in ('carrier', 'orders', 'shipment')
+        if f"{name}_text" in tables
+        or ("service_level TEXT" in tables.get(name, '') or "order_status TEXT" in tables.get(name, ''))
+    ]
+
+def write_json(data, filepath: str):
+    """Write data as 2-space indented JSON, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2)
+
+# NumPy recommendation kernel with the planning constants inlined as literals.
+# The expressions keep the same operation order as the numba kernel, so constants
+# are not folded together (e.g. safety + replenishment days) to keep results identical
+_RECS_KERNEL_TEMPLATE = """
+def kernel(velocity, ship_time, available):
+    safety_stock = velocity * {safety_days!r}
+    reorder_point = velocity * (ship_time + {threshold_days!r})
+    target_stock = safety_stock + velocity * {replenishment_days!r}
+    keep = available <= reorder_point
+    recommended_qty = np.maximum(1, (target_stock - available).astype(np.int64))
+    urgency = (reorder_point - available) / reorder_point * 100
+    return keep, recommended_qty, safety_stock, reorder_point, target_stock, urgency
+"""
+
+# Generated kernels keyed by (safety_days, threshold_days, replenishment_days)
+_recs_kernels: Dict[Tuple[float, float, float], object] = {}
+
+def _specialized_recs_kernel(safety_days: float, threshold_days: float, replenishment_days: float):
+    """Return the NumPy recommendation kernel specialized for these constants."""
+    key = (safety_days, threshold_days, replenishment_days)
+    kernel = _recs_kernels.get(key)
+    if kernel is None:
+        source = _RECS_KERNEL_TEMPLATE.format(safety_days=safety_days, threshold_days=threshold_days,
+                                              replenishment_days=replenishment_days)
+        namespace = {'np': np}
+        exec(compile(source, f"<recs_kernel {key}>", 'exec'), namespace)
+        kernel = _recs_kernels[key] = namespace['kernel']
+    return kernel
+
+def _compute_recs_numpy(velocity: np.ndarray, ship_time: np.ndarray, available: np.ndarray,
+                        safety_days: float, threshold_days: float, replenishment_days: float
+                        ) -> Tuple[np.ndarray, ...]:
+    """Return (keep, qty, safety, reorder, target, urgency) using vectorized NumPy passes."""
+    kernel = _specialized_recs_kernel(safety_days, threshold_days, replenishment_days)
+    return kernel(velocity, ship_time, available)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _compute_recs(velocity, ship_time, available, safety_days, threshold_days, replenishment_days):
+        """Return (keep, qty, safety, reorder, target, urgency) in one fused compiled pass."""
+        n = velocity.shape[0]
+        keep = np.zeros(n, np.bool_)
+        recommended_qty = np.empty(n, np.int64)
+        safety_stock = np.empty(n, np.float64)
+        reorder_point = np.empty(n, np.float64)
+        target_stock = np.empty(n, np.float64)
+        urgency = np.empty(n, np.float64)
+        for i in range(n):
+            reorder = velocity[i] * (ship_time[i] + threshold_days)
+            safety = velocity[i] * safety_days
+            target = safety + velocity[i] * replenishment_days
+            keep[i] = available[i] <= reorder
+            recommended_qty[i] = max(1, int(target - available[i]))
+            safety_stock[i] = safety
+            reorder_point[i] = reorder
+            target_stock[i] = target
+            urgency[i] = (reorder - available[i]) / reorder * 100
+        return keep, recommended_qty, safety_stock, reorder_point, target_stock, urgency
+else:
+    _compute_recs = _compute_recs_numpy
+
 class RestockingSystem:
+    # Candidate rows at or below their reorder point, with the velocity and
+    # shipment-time defaults applied in SQL
+    _CANDIDATES_SQL = '''
+        WITH velocity AS (
+            SELECT 
+                o.product_id,
+                s.warehouse_id,
+                SUM(o.quantity) * 1.0 / ? as velocity
+            FROM orders o
+            JOIN shipment s ON o.order_id = s.order_id
+            WHERE o.order_date >= ? AND o.order_status IN (1, 2)  -- Shipped, Delivered
+            GROUP BY o.product_id, s.warehouse_id
+        ),
+        ship_time AS (
+            SELECT 
+                warehouse_id,
+                AVG(delivery_days) as avg_days
+            FROM shipment 
+            WHERE delivery_days IS NOT NULL
+            GROUP BY warehouse_id
+        ),
+        stock AS (
+            SELECT 
+                i.product_id,
+                i.warehouse_id,
+                i.stock_quantity - i.reserved_quantity as available_qty,
+                COALESCE(v.velocity, 0.1) as velocity,
+                COALESCE(NULLIF(st.avg_days, 0), 5.0) as avg_shipment_time
+            FROM inventory i
+            LEFT JOIN velocity v ON i.product_id = v.product_id 
+                AND i.warehouse_id = v.warehouse_id
+            LEFT JOIN ship_time st ON i.warehouse_id = st.warehouse_id
+        )
+        SELECT product_id, warehouse_id, available_qty, velocity, avg_shipment_time
+        FROM stock
+        WHERE available_qty <= velocity * (avg_shipment_time + ?)
+    '''
+    
+    # Restock report templates, formatted once per report, record and warehouse
+    _REPORT_HEADER = (
+        "=" * 80 + "\n"
+        "INVENTORY RESTOCKING RECOMMENDATIONS REPORT\n" +
+        "=" * 80 + "\n"
+        "Generated on: {generated_on}\n"
+        "Total recommendations: {total}\n"
+    )
+    _REPORT_BODY = (
+        "{header}\n"
+        "TOP PRIORITY RESTOCKS:\n" +
+        "-" * 50 + "\n"
+        "{entries}\n"
+        "SUMMARY BY WAREHOUSE:\n" +
+        "-" * 30 + "\n"
+        "{summary}"
+    )
+    _REPORT_ENTRY = (
+        "{i:2d}. Product: {product_id} | Warehouse: {warehouse_id}\n"
+        "    Recommended Quantity: {recommended_restock_quantity:,}\n"
+        "    Current Stock: {current_available_stock}\n"
+        "    Urgency Score: {urgency_score}%\n"
+        "    Sales Velocity: {sales_velocity_per_day}/day\n"
+        "\n"
+    )
+    _REPORT_WAREHOUSE = "{warehouse_id}: {count} products, {total_qty:,} total units"
+    
     def __init__(self, db_path: str = "inventory.db"):
         """Initialize the restocking system with database connection."""
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        # Compile (or load the cached) kernel for the default constants up front,
+        # off the recommendation path
+        if NUMBA_AVAILABLE:
+            _compute_recs(np.ones(1), np.ones(1), np.ones(1, dtype=np.int64), 14.0, 7.0, 30.0)
+        else:
+            _specialized_recs_kernel(14.0, 7.0, 30.0)
+        # Memoized recommendations keyed by (safety_stock_days, restock_threshold_days)
+        self._rec_cache: Dict[Tuple[int, int], List[Dict]] = {}
         self.setup_database()
         
     def setup_database(self):
         """Create database tables based on the ontology schema."""
-        cursor = self.conn.cursor()
+        # One explicit transaction so the enum migration's renames, creates,
+        # copies and drops commit together or not at all
+        with self.conn:
+            self.conn.execute("BEGIN")
+            
+            cursor = self.conn.cursor()
+            
+            # Tables created with TEXT enum columns (or left as <name>_text by an
+            # interrupted upgrade) are moved aside and copied into the
+            # integer-coded tables once those exist
+            legacy_tables = pending_enum_migrations(self.conn)
+            self._rename_text_enum_tables(cursor, legacy_tables)
+            
+            # Customer table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS customer (
+                    customer_id TEXT PRIMARY KEY,
+                    customer_name TEXT NOT NULL,
+                    email TEXT UNIQUE NOT NULL,
+                    registration_date DATE NOT NULL
+                )
+            ''')
+            
+            # Product table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS product (
+                    product_id TEXT PRIMARY KEY,
+                    product_name TEXT NOT NULL,
+                    product_category TEXT NOT NULL,
+                    unit_price DECIMAL(10,2) NOT NULL
+                )
+            ''')
+            
+            # Warehouse table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS warehouse (
+                    warehouse_id TEXT PRIMARY KEY,
+                    warehouse_name TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    capacity INTEGER NOT NULL
+                )
+            ''')
+            
+            # Carrier table - with CHECK constraint for service_level enum (SERVICE_LEVELS code)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS carrier (
+                    carrier_id TEXT PRIMARY KEY,
+                    service_level INTEGER NOT NULL CHECK (service_level BETWEEN 0 AND 2),
+                    avg_delivery_time INTEGER NOT NULL
+                )
+            ''')
+            
+            # Order table - with CHECK constraint for order_status enum (ORDER_STATUSES code)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_id TEXT PRIMARY KEY,
+                    customer_id TEXT NOT NULL,
+                    product_id TEXT NOT NULL,
+                    order_date DATE NOT NULL,
+                    order_status INTEGER NOT NULL CHECK (order_status BETWEEN 0 AND 3),
+                    quantity INTEGER NOT NULL,
+                    FOREIGN KEY (customer_id) REFERENCES customer(customer_id),
+                    FOREIGN KEY (product_id) REFERENCES product(product_id)
+                )
+            ''')
+            
+            # Inventory table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS inventory (
+                    product_id TEXT NOT NULL,
+                    warehouse_id TEXT NOT NULL,
+                    stock_quantity INTEGER NOT NULL,
+                    reserved_quantity INTEGER NOT NULL,
+                    last_updated TIMESTAMP NOT NULL,
+                    PRIMARY KEY (product_id, warehouse_id),
+                    FOREIGN KEY (product_id) REFERENCES product(product_id),
+                    FOREIGN KEY (warehouse_id) REFERENCES warehouse(warehouse_id)
+                )
+            ''')
+            
+            # Shipment table - with CHECK constraints for service_level and shipment_status
+            # enums (SERVICE_LEVELS and SHIPMENT_STATUSES codes)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS shipment (
+                    shipment_id TEXT PRIMARY KEY,
+                    order_id TEXT NOT NULL,
+                    warehouse_id TEXT NOT NULL,
+                    carrier_id TEXT NOT NULL,
+                    service_level INTEGER NOT NULL CHECK (service_level BETWEEN 0 AND 2),
+                    shipment_status INTEGER NOT NULL CHECK (shipment_status BETWEEN 0 AND 2),
+                    ship_date DATE NOT NULL,
+                    estimated_delivery DATE NOT NULL,
+                    actual_delivery DATE,
+                    tracking_number TEXT UNIQUE NOT NULL,
+                    delivery_days INTEGER,
+                    FOREIGN KEY (order_id) REFERENCES orders(order_id),
+                    FOREIGN KEY (warehouse_id) REFERENCES warehouse(warehouse_id),
+                    FOREIGN KEY (carrier_id) REFERENCES carrier(carrier_id)
+                )
+            ''')
+            
+            # Older databases all predate delivery_days as well; the enum copy
+            # computes it from the stored dates
+            if legacy_tables:
+                self._copy_text_enum_tables(cursor, legacy_tables)
+            
+            # Secondary indexes for the sales-velocity, shipment-time and carrier lookups
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_date_status ON orders(order_date, order_status)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_shipment_order ON shipment(order_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_shipment_warehouse_days ON shipment(warehouse_id, delivery_days)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_carrier_service ON carrier(service_level)')
+    
+    def _rename_text_enum_tables(self, cursor: sqlite3.Cursor, legacy_tables: List[str]):
+        """Rename tables that still store enums as TEXT to <name>_text."""
+        existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        # Legacy rename leaves other tables' foreign keys pointing at the original names
+        cursor.execute("PRAGMA legacy_alter_table=ON")
+        for name in legacy_tables:
+            # A leftover <name>_text from an interrupted upgrade is copied as is
+            if f"{name}_text" not in existing:
+                cursor.execute(f"ALTER TABLE {name} RENAME TO {name}_text")
+        cursor.execute("PRAGMA legacy_alter_table=OFF")
+    
+    def _copy_text_enum_tables(self, cursor: sqlite3.Cursor, legacy_tables: List[str]):
+        """Copy renamed TEXT-enum tables into the integer-coded tables and drop them."""
+        # OR IGNORE keeps rows already written to the new tables after an
+        # interrupted upgrade
+        copy_sql = {
+            'carrier': f"""
+                INSERT OR IGNORE INTO carrier
+                SELECT carrier_id, {_enum_case('service_level', SERVICE_LEVELS)}, avg_delivery_time
+                FROM carrier_text
+            """,
+            'orders': f"""
+                INSERT OR IGNORE INTO orders
+                SELECT order_id, customer_id, product_id, order_date,
+                    {_enum_case('order_status', ORDER_STATUSES)}, quantity
+                FROM orders_text
+            """,
+            'shipment': f"""
+                INSERT OR IGNORE INTO shipment
+                SELECT shipment_id, order_id, warehouse_id, carrier_id,
+                    {_enum_case('service_level', SERVICE_LEVELS)},
+                    {_enum_case('shipment_status', SHIPMENT_STATUSES)},
+                    ship_date, estimated_delivery, actual_delivery, tracking_number,
+                    CAST(ROUND(julianday(actual_delivery) - julianday(ship_date)) AS INTEGER)
+                FROM shipment_text
+            """,
+        }
+        for name in legacy_tables:
+            cursor.execute(copy_sql[name])
+            # Dropping the old table also drops its indexes, freeing their names
+            cursor.execute(f"DROP TABLE {name}_text")
+        
+    def generate_dummy_data(self):
+        """Generate dummy data for all tables (200 rows where applicable)."""
+        print("Generating dummy data...")
         
-        # Customer table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customer (
-                customer_id TEXT PRIMARY KEY,
-                customer_name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                registration_date DATE NOT NULL
+        # One explicit transaction for the whole load instead of per-statement
+        # commits; the context manager commits on success and rolls back on error
+        with self.conn:
+            self.conn.execute("BEGIN")
+            
+            # Draw each column as a batch from one generator instead of
+            # per-row random.* calls
+            rng = np.random.default_rng()
+            now = datetime.now()
+            
+            # Generate Customers (50 customers)
+            reg_days = rng.integers(30, 366, size=len(CUSTOMER_IDS)).tolist()
+            customers = [
+                (customer_id, f"Customer {customer_id}",
+                 f"customer{i}@example.com", (now - timedelta(days=d)).date())
+                for i, (customer_id, d) in enumerate(zip(CUSTOMER_IDS, reg_days), 1)
+            ]
+            
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO customer VALUES (?, ?, ?, ?)", customers
             )
-        ''')
-        
-        # Product table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS product (
-                product_id TEXT PRIMARY KEY,
-                product_name TEXT NOT NULL,
-                product_category TEXT NOT NULL,
-                unit_price DECIMAL(10,2) NOT NULL
+            
+            # Generate Products (30 products)
+            categories = ['Electronics', 'Clothing', 'Books', 'Home & Garden', 'Sports', 'Toys']
+            product_categories = rng.choice(categories, size=len(PRODUCT_IDS)).tolist()
+            unit_prices = rng.uniform(10.0, 500.0, size=len(PRODUCT_IDS)).tolist()
+            products = [
+                (product_id, f"Product {product_id}", category, round(price, 2))
+                for product_id, category, price in zip(PRODUCT_IDS, product_categories, unit_prices)
+            ]
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO product VALUES (?, ?, ?, ?)", products
             )
-        ''')
-        
-        # Warehouse table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS warehouse (
-                warehouse_id TEXT PRIMARY KEY,
-                warehouse_name TEXT NOT NULL,
-                location TEXT NOT NULL,
-                capacity INTEGER NOT NULL
+            
+            # Generate Warehouses (10 warehouses)
+            locations = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 
+                        'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose']
+            capacities = rng.integers(1000, 10001, size=len(WAREHOUSE_IDS)).tolist()
+            warehouses = [
+                (warehouse_id, f"Warehouse {warehouse_id}", location, capacity)
+                for warehouse_id, location, capacity in zip(WAREHOUSE_IDS, locations, capacities)
+            ]
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO warehouse VALUES (?, ?, ?, ?)", warehouses
             )
-        ''')
-        
-        # Carrier table - with CHECK constraint for service_level enum
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS carrier (
-                carrier_id TEXT PRIMARY KEY,
-                service_level TEXT NOT NULL CHECK (service_level IN ('Standard', 'Express', 'Overnight')),
-                avg_delivery_time INTEGER NOT NULL
+            
+            # Generate Carriers (3 carriers) - Standardized delivery times across all carriers
+            carriers = [
+                ('CarrierA', SERVICE_LEVEL['Express'], 2),
+                ('CarrierA', SERVICE_LEVEL['Standard'], 5),
+                ('CarrierA', SERVICE_LEVEL['Overnight'], 1),
+                ('CarrierB', SERVICE_LEVEL['Express'], 2),
+                ('CarrierB', SERVICE_LEVEL['Standard'], 5),
+                ('CarrierB', SERVICE_LEVEL['Overnight'], 1),
+                ('CarrierC', SERVICE_LEVEL['Express'], 2),
+                ('CarrierC', SERVICE_LEVEL['Standard'], 5),
+                ('CarrierC', SERVICE_LEVEL['Overnight'], 1)
+            ]
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO carrier VALUES (?, ?, ?)", carriers
             )
-        ''')
-        
-        # Order table - with CHECK constraint for order_status enum
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                order_id TEXT PRIMARY KEY,
-                customer_id TEXT NOT NULL,
-                product_id TEXT NOT NULL,
-                order_date DATE NOT NULL,
-                order_status TEXT NOT NULL CHECK (order_status IN ('Pending', 'Shipped', 'Delivered', 'Canceled')),
-                quantity INTEGER NOT NULL,
-                FOREIGN KEY (customer_id) REFERENCES customer(customer_id),
-                FOREIGN KEY (product_id) REFERENCES product(product_id)
+            
+            # Generate Orders (200 orders)
+            n_orders = 200
+            order_customers = rng.integers(0, len(CUSTOMER_IDS), size=n_orders).tolist()
+            order_products = rng.integers(0, len(PRODUCT_IDS), size=n_orders).tolist()
+            order_days = rng.integers(0, 61, size=n_orders).tolist()
+            order_status = rng.integers(0, len(ORDER_STATUSES), size=n_orders).tolist()
+            order_qty = rng.integers(1, 11, size=n_orders).tolist()
+            orders = [
+                (f"O{i:04d}", CUSTOMER_IDS[c], PRODUCT_IDS[p],
+                 (now - timedelta(days=d)).date(), status, qty)
+                for i, (c, p, d, status, qty) in enumerate(
+                    zip(order_customers, order_products, order_days, order_status, order_qty), 1)
+            ]
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?)", orders
             )
-        ''')
-        
-        # Inventory table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS inventory (
-                product_id TEXT NOT NULL,
-                warehouse_id TEXT NOT NULL,
-                stock_quantity INTEGER NOT NULL,
-                reserved_quantity INTEGER NOT NULL,
-                last_updated TIMESTAMP NOT NULL,
-                PRIMARY KEY (product_id, warehouse_id),
-                FOREIGN KEY (product_id) REFERENCES product(product_id),
-                FOREIGN KEY (warehouse_id) REFERENCES warehouse(warehouse_id)
+            
+            # Generate Inventory (all product-warehouse combinations)
+            stock = rng.integers(0, 501, size=len(PRODUCT_IDS) * len(WAREHOUSE_IDS))
+            reserved = rng.integers(0, np.minimum(50, stock) + 1)
+            # Rows are streamed straight into executemany; `now` is shared by all rows
+            inventory = (
+                (product_id, warehouse_id, stock_quantity, reserved_quantity, now)
+                for (product_id, warehouse_id), stock_quantity, reserved_quantity in zip(
+                    ((p, w) for p in PRODUCT_IDS for w in WAREHOUSE_IDS),
+                    stock.tolist(), reserved.tolist())
             )
-        ''')
-        
-        # Shipment table - with CHECK constraint for shipment_status enum
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS shipment (
-                shipment_id TEXT PRIMARY KEY,
-                order_id TEXT NOT NULL,
-                warehouse_id TEXT NOT NULL,
-                carrier_id TEXT NOT NULL,
-                service_level TEXT NOT NULL CHECK (service_level IN ('Standard', 'Express', 'Overnight')),
-                shipment_status TEXT NOT NULL CHECK (shipment_status IN ('In Transit', 'Delivered', 'Delayed')),
-                ship_date DATE NOT NULL,
-                estimated_delivery DATE NOT NULL,
-                actual_delivery DATE,
-                tracking_number TEXT UNIQUE NOT NULL,
-                FOREIGN KEY (order_id) REFERENCES orders(order_id),
-                FOREIGN KEY (warehouse_id) REFERENCES warehouse(warehouse_id),
-                FOREIGN KEY (carrier_id) REFERENCES carrier(carrier_id)
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO inventory VALUES (?, ?, ?, ?, ?)", inventory
+            )
+            
+            # Generate Shipments (for shipped/delivered orders)
+            shipped_filter = "FROM orders WHERE order_status IN (1, 2)"  # Shipped, Delivered
+            # Only the count is fetched up front to size the random batches
+            n_ship = cursor.execute(f"SELECT COUNT(*) {shipped_filter}").fetchone()[0]
+            
+            # Define service level weights for more balanced distribution
+            # 30% Express, 50% Standard, 20% Overnight
+            service_weights = {'Express': 0.3, 'Standard': 0.5, 'Overnight': 0.2}
+            
+            # Load carrier options once, keyed by service level
+            carriers_by_sl = {}
+            for sl, c_id, c_time in cursor.execute(
+                "SELECT service_level, carrier_id, avg_delivery_time FROM carrier"
+            ):
+                carriers_by_sl.setdefault(sl, []).append((c_id, c_time))
+            
+            ship_warehouses = rng.integers(0, len(WAREHOUSE_IDS), size=n_ship).tolist()
+            ship_levels = rng.choice(len(SERVICE_LEVELS), size=n_ship,
+                                     p=[service_weights[name] for name in SERVICE_LEVELS]).tolist()
+            carrier_picks = rng.random(size=n_ship).tolist()
+            ship_status = rng.integers(0, len(SHIPMENT_STATUSES), size=n_ship).tolist()
+            ship_days = rng.integers(1, 31, size=n_ship).tolist()
+            # Usually 1-2 day buffer, sometimes none
+            buffer_days = rng.choice([0, 1, 1, 2], size=n_ship).tolist()
+            # Usually on time or 1-2 days late
+            delivery_variance = rng.integers(-1, 3, size=n_ship).tolist()
+            tracking_numbers = rng.integers(100000, 1000000, size=n_ship).tolist()
+            
+            shipments = []
+            # Order rows stream straight from the cursor
+            for i, (order_id,) in enumerate(cursor.execute(f"SELECT order_id {shipped_filter}")):
+                shipment_id = f"S{i+1:04d}"
+                warehouse_id = WAREHOUSE_IDS[ship_warehouses[i]]
+                service_level = ship_levels[i]
+                
+                # Get available carriers for this service level
+                carrier_options = carriers_by_sl.get(service_level)
+                
+                if carrier_options:
+                    carrier_id, base_delivery_time = carrier_options[
+                        int(carrier_picks[i] * len(carrier_options))]
+                else:
+                    # Fallback - shouldn't happen with our setup, but just in case
+                    carrier_id = ['CarrierA', 'CarrierB', 'CarrierC'][int(carrier_picks[i] * 3)]
+                    base_delivery_time = 3
+                
+                status = ship_status[i]
+                ship_date = now - timedelta(days=ship_days[i])
+                
+                # Add realistic variability with more conservative estimates
+                # Carriers typically promise slightly longer times to ensure on-time delivery
+                estimated_delivery_days = base_delivery_time + buffer_days[i]
+                
+                # Actual delivery has some variability but is generally close to carrier's capability
+                actual_delivery_days = base_delivery_time + delivery_variance[i]
+                actual_delivery_days = max(1, actual_delivery_days)  # Minimum 1 day
+                
+                est_delivery = ship_date + timedelta(days=estimated_delivery_days)
+                actual_delivery = None
+                delivery_days = None
+                if status == SHIPMENT_STATUS['Delivered']:
+                    actual_delivery = ship_date + timedelta(days=actual_delivery_days)
+                    delivery_days = actual_delivery_days
+                tracking_number = f"TRK{tracking_numbers[i]}"
+                
+                shipments.append((shipment_id, order_id, warehouse_id, carrier_id,
+                                service_level, status, ship_date.date(), est_delivery.date(),
+                                actual_delivery.date() if actual_delivery else None,
+                                tracking_number, delivery_days))
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO shipment VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                shipments
             )
-        ''')
-        
-        self.conn.commit()
-        
-    def generate_dummy_data(self):
-        """Generate dummy data for all tables (200 rows where applicable)."""
-        print("Generating dummy data...")
-        
-        # Generate Customers (50 customers)
-        customers = []
-        for i in range(50):
-            customer_id = f"C{str(i+1).zfill(3)}"
-            customer_name = f"Customer {customer_id}"
-            email = f"customer{i+1}@example.com"
-            reg_date = datetime.now() - timedelta(days=random.randint(30, 365))
-            customers.append((customer_id, customer_name, email, reg_date.date()))
-        
-        cursor = self.conn.cursor()
-        cursor.executemany(
-            "INSERT OR REPLACE INTO customer VALUES (?, ?, ?, ?)", customers
-        )
-        
-        # Generate Products (30 products)
-        products = []
-        categories = ['Electronics', 'Clothing', 'Books', 'Home & Garden', 'Sports', 'Toys']
-        for i in range(30):
-            product_id = f"P{str(i+1).zfill(3)}"
-            product_name = f"Product {product_id}"
-            category = random.choice(categories)
-            unit_price = round(random.uniform(10.0, 500.0), 2)
-            products.append((product_id, product_name, category, unit_price))
-        
-        cursor.executemany(
-            "INSERT OR REPLACE INTO product VALUES (?, ?, ?, ?)", products
-        )
-        
-        # Generate Warehouses (10 warehouses)
-        warehouses = []
-        locations = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 
-                    'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose']
-        for i in range(10):
-            warehouse_id = f"W{str(i+1).zfill(2)}"
-            warehouse_name = f"Warehouse {warehouse_id}"
-            location = locations[i]
-            capacity = random.randint(1000, 10000)
-            warehouses.append((warehouse_id, warehouse_name, location, capacity))
-        
-        cursor.executemany(
-            "INSERT OR REPLACE INTO warehouse VALUES (?, ?, ?, ?)", warehouses
-        )
-        
-        # Generate Carriers (3 carriers) - Standardized delivery times across all carriers
-        carriers = [
-            ('CarrierA', 'Express', 2),
-            ('CarrierA', 'Standard', 5),
-            ('CarrierA', 'Overnight', 1),
-            ('CarrierB', 'Express', 2),
-            ('CarrierB', 'Standard', 5),
-            ('CarrierB', 'Overnight', 1),
-            ('CarrierC', 'Express', 2),
-            ('CarrierC', 'Standard', 5),
-            ('CarrierC', 'Overnight', 1)
-        ]
-        
-        cursor.executemany(
-            "INSERT OR REPLACE INTO carrier VALUES (?, ?, ?)", carriers
-        )
-        
-        # Generate Orders (200 orders)
-        orders = []
-        order_statuses = ['Pending', 'Shipped', 'Delivered', 'Canceled']
-        
-        for i in range(200):
-            order_id = f"O{str(i+1).zfill(4)}"
-            customer_id = f"C{str(random.randint(1, 50)).zfill(3)}"
-            product_id = f"P{str(random.randint(1, 30)).zfill(3)}"
-            order_date = datetime.now() - timedelta(days=random.randint(0, 60))
-            status = random.choice(order_statuses)
-            quantity = random.randint(1, 10)
-            orders.append((order_id, customer_id, product_id, order_date.date(), status, quantity))
-        
-        cursor.executemany(
-            "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?)", orders
-        )
-        
-        # Generate Inventory (all product-warehouse combinations)
-        inventory = []
-        for p in range(1, 31):  # 30 products
-            for w in range(1, 11):  # 10 warehouses
-                product_id = f"P{str(p).zfill(3)}"
-                warehouse_id = f"W{str(w).zfill(2)}"
-                stock_quantity = random.randint(0, 500)
-                reserved_quantity = random.randint(0, min(50, stock_quantity))
-                last_updated = datetime.now()
-                inventory.append((product_id, warehouse_id, stock_quantity, 
-                                reserved_quantity, last_updated))
-        
-        cursor.executemany(
-            "INSERT OR REPLACE INTO inventory VALUES (?, ?, ?, ?, ?)", inventory
-        )
-        
-        # Generate Shipments (for shipped/delivered orders)
-        shipped_orders = cursor.execute(
-            "SELECT order_id FROM orders WHERE order_status IN ('Shipped', 'Delivered')"
-        ).fetchall()
-        
-        # Define service levels and their weights for more balanced distribution
-        service_levels = ['Express', 'Standard', 'Overnight']
-        service_weights = [0.3, 0.5, 0.2]  # 30% Express, 50% Standard, 20% Overnight
-        
-        shipments = []
-        for i, (order_id,) in enumerate(shipped_orders):
-            shipment_id = f"S{str(i+1).zfill(4)}"
-            warehouse_id = f"W{str(random.randint(1, 10)).zfill(2)}"
-            
-            # Select service level with weighted distribution
-            service_level = random.choices(service_levels, weights=service_weights)[0]
-            
-            # Get available carriers for this service level
-            carrier_options = cursor.execute(
-                "SELECT carrier_id, avg_delivery_time FROM carrier WHERE service_level = ?",
-                (service_level,)
-            ).fetchall()
-            
-            if carrier_options:
-                selected_carrier = random.choice(carrier_options)
-                carrier_id = selected_carrier[0]
-                base_delivery_time = selected_carrier[1]
-            else:
-                # Fallback - shouldn't happen with our setup, but just in case
-                carrier_id = random.choice(['CarrierA', 'CarrierB', 'CarrierC'])
-                base_delivery_time = 3
-            
-            status = random.choice(['In Transit', 'Delivered', 'Delayed'])
-            ship_date = datetime.now() - timedelta(days=random.randint(1, 30))
-            
-            # Add realistic variability with more conservative estimates
-            # Carriers typically promise slightly longer times to ensure on-time delivery
-            buffer_days = random.choice([0, 1, 1, 2])  # Usually 1-2 day buffer, sometimes none
-            estimated_delivery_days = base_delivery_time + buffer_days
-            
-            # Actual delivery has some variability but is generally close to carrier's capability
-            actual_delivery_variance = random.randint(-1, 2)  # Usually on time or 1-2 days late
-            actual_delivery_days = base_delivery_time + actual_delivery_variance
-            actual_delivery_days = max(1, actual_delivery_days)  # Minimum 1 day
-            
-            est_delivery = ship_date + timedelta(days=estimated_delivery_days)
-            actual_delivery = None
-            if status == 'Delivered':
-                actual_delivery = ship_date + timedelta(days=actual_delivery_days)
-            tracking_number = f"TRK{random.randint(100000, 999999)}"
-            
-            shipments.append((shipment_id, order_id, warehouse_id, carrier_id,
-                            service_level, status, ship_date.date(), est_delivery.date(),
-                            actual_delivery.date() if actual_delivery else None,
-                            tracking_number))
-        
-        cursor.executemany(
-            "INSERT OR REPLACE INTO shipment VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            shipments
-        )
         
-        self.conn.commit()
+        # Refresh planner statistics for the new data
+        self.conn.execute("ANALYZE")
+        # Cached recommendations were computed from the previous data
+        self._rec_cache.clear()
         print("Dummy data generated successfully!")
         
     def calculate_sales_velocity(self, days: int = 30) -> Dict[Tuple[str, str], float]:
@@ -290,7 +564,7 @@ class RestockingSystem:
                 SUM(o.quantity) as total_sold
             FROM orders o
             JOIN shipment s ON o.order_id = s.order_id
-            WHERE o.order_date >= ? AND o.order_status IN ('Shipped', 'Delivered')
+            WHERE o.order_date >= ? AND o.order_status IN (1, 2)  -- Shipped, Delivered
             GROUP BY o.product_id, s.warehouse_id
         '''
         
@@ -308,9 +582,9 @@ class RestockingSystem:
         query = '''
             SELECT 
                 warehouse_id,
-                AVG(julianday(actual_delivery) - julianday(ship_date)) as avg_days
+                AVG(delivery_days) as avg_days
             FROM shipment 
-            WHERE actual_delivery IS NOT NULL
+            WHERE delivery_days IS NOT NULL
             GROUP BY warehouse_id
         '''
         
@@ -348,6 +622,43 @@ class RestockingSystem:
             
         return inventory
     
+    def _execute_restock_candidates(self, restock_threshold_days: int, days: int) -> sqlite3.Cursor:
+        """Run the candidate query and return the cursor positioned at the first row."""
+        cutoff_date = datetime.now() - timedelta(days=days)
+        return self.conn.execute(self._CANDIDATES_SQL,
+                                 (days, cutoff_date.date(), restock_threshold_days))
+    
+    def get_restock_candidates(self, restock_threshold_days: int = 7,
+                               days: int = 30) -> List[Tuple[str, str, int, float, float]]:
+        """
+        Get product-warehouse combinations at or below their reorder point.
+        
+        Returns (product_id, warehouse_id, available_qty, velocity, avg_shipment_time)
+        rows, applying the same defaults as calculate_sales_velocity and
+        get_average_shipment_time (0.1 units/day and 5 days).
+        """
+        return self._execute_restock_candidates(restock_threshold_days, days).fetchall()
+    
+    def iter_restock_candidate_chunks(self, restock_threshold_days: int = 7, days: int = 30,
+                                      chunk_rows: int = 50_000):
+        """
+        Stream restock candidates as column batches of at most chunk_rows rows.
+        
+        Yields (product_ids, warehouse_ids, available, velocity, ship_time), with the
+        numeric columns as typed NumPy arrays, so large inventories are never
+        materialized as a single list of row tuples.
+        """
+        cursor = self._execute_restock_candidates(restock_threshold_days, days)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            product_ids, warehouse_ids, available, velocity, ship_time = zip(*rows)
+            yield (product_ids, warehouse_ids,
+                   np.array(available, dtype=np.int64),
+                   np.array(velocity, dtype=np.float64),
+                   np.array(ship_time, dtype=np.float64))
+    
     def calculate_restock_recommendations(self, 
                                        safety_stock_days: int = 14,
                                        restock_threshold_days: int = 7) -> List[Dict]:
@@ -358,87 +669,91 @@ class RestockingSystem:
         - Average shipment times
         - Safety stock requirements
         """
-        print("Calculating restock recommendations...")
+        key = (safety_stock_days, restock_threshold_days)
+        if key in self._rec_cache:
+            return list(self._rec_cache[key])
         
-        # Get required data
-        sales_velocity = self.calculate_sales_velocity()
-        shipment_times = self.get_average_shipment_time()
-        current_inventory = self.get_current_inventory()
+        print("Calculating restock recommendations...")
         
-        recommendations = []
+        # Safety stock = velocity * safety_stock_days
+        # Reorder point = velocity * (shipment_time + restock_threshold_days)
+        # Target stock = safety stock + velocity * replenishment_period
+        replenishment_period = 30  # Plan for 30 days
+        
+        # Only rows at or below their reorder point come back from SQL; they are
+        # streamed in column chunks and only the kept rows of each chunk are retained
+        keys = []
+        chunks = []
+        for product_ids, warehouse_ids, available, velocity, ship_time in \
+                self.iter_restock_candidate_chunks(restock_threshold_days):
+            keep, recommended_qty, safety_stock, reorder_point, target_stock, urgency = _compute_recs(
+                velocity, ship_time, available,
+                float(safety_stock_days), float(restock_threshold_days), float(replenishment_period))
+            kept = np.flatnonzero(keep)
+            keys.extend((product_ids[i], warehouse_ids[i]) for i in kept.tolist())
+            chunks.append(tuple(column[kept] for column in (
+                recommended_qty, available, velocity, ship_time,
+                reorder_point, safety_stock, target_stock, urgency)))
+        
+        if not keys:
+            self._rec_cache[key] = []
+            return []
+        
+        (recommended_qty, available, velocity, ship_time,
+         reorder_point, safety_stock, target_stock, urgency) = (np.concatenate(column)
+                                                               for column in zip(*chunks))
+        
+        # Sort the kept rows by urgency score (highest first) with one stable
+        # argsort, keeping ties in query order. Scores go through Python round()
+        # to keep the half-way behaviour of the report values
+        urgency_scores = np.array([round(u, 1) for u in urgency.tolist()])
+        order = np.argsort(-urgency_scores, kind='stable')
+        
+        recommendations = [
+            {
+                'product_id': keys[i][0],
+                'warehouse_id': keys[i][1],
+                'recommended_restock_quantity': qty,
+                'current_available_stock': avail,
+                'sales_velocity_per_day': round(vel, 2),
+                'avg_shipment_time_days': round(st, 1),
+                'reorder_point': round(rp, 1),
+                'safety_stock': round(ss, 1),
+                'target_stock': round(ts, 1),
+                'urgency_score': urg
+            }
+            for i, qty, avail, vel, st, rp, ss, ts, urg in zip(
+                order.tolist(),
+                recommended_qty[order].tolist(),
+                available[order].tolist(),
+                velocity[order].tolist(),
+                ship_time[order].tolist(),
+                reorder_point[order].tolist(),
+                safety_stock[order].tolist(),
+                target_stock[order].tolist(),
+                urgency_scores[order].tolist()
+            )
+        ]
         
-        for (product_id, warehouse_id), inventory_data in current_inventory.items():
-            available_qty = inventory_data['available_quantity']
-            
-            # Get sales velocity for this product-warehouse combination
-            velocity = sales_velocity.get((product_id, warehouse_id), 0.1)  # Default low velocity
-            
-            # Get average shipment time for this warehouse
-            avg_shipment_time = shipment_times.get(warehouse_id, 5.0)  # Default 5 days
-            
-            # Calculate required stock levels
-            # Safety stock = velocity * safety_stock_days
-            safety_stock = velocity * safety_stock_days
-            
-            # Reorder point = velocity * (shipment_time + restock_threshold_days)
-            reorder_point = velocity * (avg_shipment_time + restock_threshold_days)
-            
-            # Check if restock is needed
-            if available_qty <= reorder_point:
-                # Calculate recommended restock quantity
-                # Target stock = safety stock + velocity * replenishment_period
-                replenishment_period = 30  # Plan for 30 days
-                target_stock = safety_stock + (velocity * replenishment_period)
-                
-                recommended_qty = max(1, int(target_stock - available_qty))
-                
-                recommendations.append({
-                    'product_id': product_id,
-                    'warehouse_id': warehouse_id,
-                    'recommended_restock_quantity': recommended_qty,
-                    'current_available_stock': available_qty,
-                    'sales_velocity_per_day': round(velocity, 2),
-                    'avg_shipment_time_days': round(avg_shipment_time, 1),
-                    'reorder_point': round(reorder_point, 1),
-                    'safety_stock': round(safety_stock, 1),
-                    'target_stock': round(target_stock, 1),
-                    'urgency_score': round((reorder_point - available_qty) / reorder_point * 100, 1)
-                })
-        
-        # Sort by urgency score (highest first)
-        recommendations.sort(key=lambda x: x['urgency_score'], reverse=True)
-        
-        return recommendations
+        self._rec_cache[key] = recommendations
+        return list(recommendations)
     
-    def generate_restock_report(self) -> str:
+    def generate_restock_report(self, recommendations: List[Dict] = None) -> str:
         """Generate a comprehensive restocking report."""
-        recommendations = self.calculate_restock_recommendations()
+        if recommendations is None:
+            recommendations = self.calculate_restock_recommendations()
         
-        report = []
-        report.append("=" * 80)
-        report.append("INVENTORY RESTOCKING RECOMMENDATIONS REPORT")
-        report.append("=" * 80)
-        report.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append(f"Total recommendations: {len(recommendations)}")
-        report.append("")
+        header = self._REPORT_HEADER.format(
+            generated_on=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            total=len(recommendations)
+        )
         
         if not recommendations:
-            report.append("No restocking needed at this time.")
-            return "\n".join(report)
-        
-        report.append("TOP PRIORITY RESTOCKS:")
-        report.append("-" * 50)
-        
-        for i, rec in enumerate(recommendations[:10], 1):  # Top 10
-            report.append(f"{i:2d}. Product: {rec['product_id']} | Warehouse: {rec['warehouse_id']}")
-            report.append(f"    Recommended Quantity: {rec['recommended_restock_quantity']:,}")
-            report.append(f"    Current Stock: {rec['current_available_stock']}")
-            report.append(f"    Urgency Score: {rec['urgency_score']}%")
-            report.append(f"    Sales Velocity: {rec['sales_velocity_per_day']}/day")
-            report.append("")
+            return header + "\nNo restocking needed at this time."
         
-        report.append("\nSUMMARY BY WAREHOUSE:")
-        report.append("-" * 30)
+        # Top 10, one template fill per record and a single join
+        entries = "".join(self._REPORT_ENTRY.format(i=i, **rec)
+                          for i, rec in enumerate(recommendations[:10], 1))
         
         warehouse_summary = {}
         for rec in recommendations:
@@ -448,21 +763,25 @@ class RestockingSystem:
             warehouse_summary[wid]['count'] += 1
             warehouse_summary[wid]['total_qty'] += rec['recommended_restock_quantity']
         
-        for warehouse_id, summary in warehouse_summary.items():
-            report.append(f"{warehouse_id}: {summary['count']} products, {summary['total_qty']:,} total units")
+        summary = "\n".join(self._REPORT_WAREHOUSE.format(warehouse_id=warehouse_id, **totals)
+                            for warehouse_id, totals in warehouse_summary.items())
         
-        return "\n".join(report)
+        return self._REPORT_BODY.format(header=header, entries=entries, summary=summary)
     
-    def export_recommendations_csv(self, filepath: str = "restock_recommendations.csv"):
+    def export_recommendations_csv(self, filepath: str = "restock_recommendations.csv",
+                                   recommendations: List[Dict] = None):
         """Export recommendations to CSV file."""
-        recommendations = self.calculate_restock_recommendations()
+        if recommendations is None:
+            recommendations = self.calculate_restock_recommendations()
         
         if not recommendations:
             print("No recommendations to export.")
             return
         
-        df = pd.DataFrame(recommendations)
-        df.to_csv(filepath, index=False)
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(recommendations[0]), lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(recommendations)
         print(f"Recommendations exported to {filepath}")
     
     def close(self):
@@ -481,17 +800,18 @@ def main():
         # Generate dummy data
         system.generate_dummy_data()
         
+        # Compute once and share with the report and both exports
+        recommendations = system.calculate_restock_recommendations()
+        
         # Generate and display report
-        report = system.generate_restock_report()
+        report = system.generate_restock_report(recommendations)
         print(report)
         
         # Export to CSV
-        system.export_recommendations_csv()
+        system.export_recommendations_csv(recommendations=recommendations)
         
         # Also save detailed recommendations as JSON
-        recommendations = system.calculate_restock_recommendations()
-        with open('detailed_recommendations.json', 'w') as f:
-            json.dump(recommendations, f, indent=2)
+        write_json(recommendations, 'detailed_recommendations.json')
         print("Detailed recommendations saved to detailed_recommendations.json")
         
     finally: